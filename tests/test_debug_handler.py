@@ -0,0 +1,134 @@
+# coding: utf-8
+
+import asyncio
+import json
+import tracemalloc
+
+from tornado.testing import AsyncHTTPTestCase, gen_test
+
+from tornado_skeleton.api.tornado_skeleton_api import WebApplication
+from tornado_skeleton.helpers.error_code import ErrorCode
+
+
+BASE_URL = '/tornado-skeleton'
+
+TOKEN = 'debug-token'
+
+INITIALIZERS = {
+    'env': 'test',
+    'contact': 'nobody@example.com',
+    'base_url': BASE_URL,
+    'api_version': '1.0.0'
+}
+
+
+class DebugEndpointsTestCase(AsyncHTTPTestCase):
+    debug_endpoints = {'enabled': True, 'token': TOKEN}
+
+    def get_app(self):
+        return WebApplication(INITIALIZERS, None, debug_endpoints=self.debug_endpoints)
+
+    def fetch_debug(self, path, token=TOKEN, **kwargs):
+        headers = {'X-Debug-Token': token} if token is not None else {}
+        return self.fetch(BASE_URL + '/_debug/' + path, headers=headers, **kwargs)
+
+    def assertError(self, response, status, code):
+        self.assertEqual(response.code, status)
+        self.assertEqual(json.loads(response.body)['code'], str(code))
+
+
+class DisabledDebugEndpointsTest(DebugEndpointsTestCase):
+    debug_endpoints = {'enabled': False, 'token': TOKEN}
+
+    def test_routes_absent(self):
+        for path in ('profile', 'memory', 'tasks'):
+            self.assertEqual(self.fetch_debug(path).code, 404)
+        self.assertEqual(self.fetch(BASE_URL + '/').code, 200)
+
+
+class NoTokenDebugEndpointsTest(DebugEndpointsTestCase):
+    debug_endpoints = {'enabled': True}
+
+    def test_forbidden_without_configured_token(self):
+        self.assertError(self.fetch_debug('tasks', token=''), 403, ErrorCode.FORBIDDEN)
+        self.assertError(self.fetch_debug('tasks', token=None), 403, ErrorCode.FORBIDDEN)
+
+
+class DebugEndpointsTest(DebugEndpointsTestCase):
+    def tearDown(self):
+        tracemalloc.stop()
+        super().tearDown()
+
+    def test_forbidden_without_valid_token(self):
+        for path in ('profile', 'memory', 'tasks'):
+            self.assertError(self.fetch_debug(path, token=None), 403, ErrorCode.FORBIDDEN)
+            self.assertError(self.fetch_debug(path, token='wrong'), 403, ErrorCode.FORBIDDEN)
+
+    def test_tasks(self):
+        response = self.fetch_debug('tasks')
+        self.assertEqual(response.code, 200)
+        body = json.loads(response.body)
+        self.assertIn('pid', body)
+        self.assertTrue(body['tasks'])
+
+    def test_invalid_profile_arguments(self):
+        for query in ('requests=abc', 'requests=0', 'seconds=nan', 'seconds=inf', 'seconds=-1',
+                      'limit=0', 'requests=x&seconds=y'):
+            response = self.fetch_debug('profile?' + query)
+            self.assertError(response, 422, ErrorCode.WRONG_PARAMETER_TYPE)
+
+    def test_invalid_memory_arguments(self):
+        for query in ('reset=maybe', 'limit=-3', 'key=module'):
+            self.assertError(self.fetch_debug('memory?' + query), 422, ErrorCode.WRONG_PARAMETER_TYPE)
+        for query in ('frames=0', 'frames=100000', 'frames=abc'):
+            response = self.fetch_debug('memory?' + query, method='POST', body='')
+            self.assertError(response, 422, ErrorCode.WRONG_PARAMETER_TYPE)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_memory_not_started(self):
+        self.assertError(self.fetch_debug('memory'), 409, ErrorCode.TRACEMALLOC_NOT_STARTED)
+
+    def test_memory(self):
+        response = self.fetch_debug('memory?frames=2', method='POST', body='')
+        self.assertEqual(response.code, 201)
+        self.assertEqual(json.loads(response.body)['frames'], 2)
+
+        response = self.fetch_debug('memory?limit=5&reset=false')
+        self.assertEqual(response.code, 200)
+        self.assertLessEqual(len(json.loads(response.body)['statistics']), 5)
+
+        self.assertEqual(self.fetch_debug('memory', method='DELETE').code, 204)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    @gen_test
+    async def test_profile_counts_application_requests_only(self):
+        url = self.get_url(BASE_URL + '/_debug/profile?requests=1&seconds=10')
+        profiling = self.http_client.fetch(url, headers={'X-Debug-Token': TOKEN}, raise_error=False)
+        while 'log_request' not in vars(self._app):
+            await asyncio.sleep(0.01)
+
+        # Debug requests, rejected or not, do not use up the requests budget
+        concurrent = await self.http_client.fetch(url, headers={'X-Debug-Token': TOKEN}, raise_error=False)
+        self.assertEqual(concurrent.code, 409)
+        self.assertEqual(json.loads(concurrent.body)['code'], str(ErrorCode.PROFILER_ALREADY_RUNNING))
+        forbidden = await self.http_client.fetch(self.get_url(BASE_URL + '/_debug/tasks'), raise_error=False)
+        self.assertEqual(forbidden.code, 403)
+        self.assertIn('log_request', vars(self._app))
+
+        main = await self.http_client.fetch(self.get_url(BASE_URL + '/'))
+        self.assertEqual(main.code, 200)
+
+        response = await profiling
+        self.assertEqual(response.code, 200)
+        self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+        self.assertIn('profiled 1 requests', response.body.decode())
+        self.assertIn('cumulative', response.body.decode())
+        self.assertNotIn('log_request', vars(self._app))
+
+    @gen_test
+    async def test_profile_duration(self):
+        response = await self.http_client.fetch(self.get_url(BASE_URL + '/_debug/profile?seconds=0.1'),
+                                                headers={'X-Debug-Token': TOKEN})
+        self.assertEqual(response.code, 200)
+        self.assertIn('profiled 0 requests', response.body.decode())
+        self.assertNotIn('log_request', vars(self._app))
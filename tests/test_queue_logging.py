@@ -0,0 +1,173 @@
+# coding: utf-8
+
+import logging
+import queue
+import threading
+import unittest
+from unittest import mock
+
+from tornado_skeleton.helpers.queue_logging import QueueLogging, RateLimitedQueueHandler
+
+
+def make_record(msg, *args, level=logging.ERROR, name='tornado_skeleton'):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+class RateLimitedQueueHandlerTest(unittest.TestCase):
+    def setUp(self):
+        self.queue = queue.Queue()
+        self.handler = RateLimitedQueueHandler(self.queue, window=10)
+        patcher = mock.patch('tornado_skeleton.helpers.queue_logging.time.monotonic', return_value=100.0)
+        self.monotonic = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def drain(self):
+        records = []
+        while not self.queue.empty():
+            records.append(self.queue.get_nowait())
+        return records
+
+    def test_duplicates_collapsed_within_window(self):
+        for _ in range(5):
+            self.handler.handle(make_record('%s - %s', 404, 'User Not Found'))
+        records = self.drain()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].getMessage(), '404 - User Not Found')
+
+    def test_distinct_records_not_collapsed(self):
+        self.handler.handle(make_record('%s - %s', 404, 'User Not Found'))
+        self.handler.handle(make_record('%s - %s', 405, 'Method Not Allowed'))
+        self.handler.handle(make_record('%s - %s', 404, 'User Not Found', name='other'))
+        self.assertEqual(len(self.drain()), 3)
+
+    def test_records_below_level_not_rate_limited(self):
+        for _ in range(3):
+            self.handler.handle(make_record('alive', level=logging.INFO))
+        self.assertEqual(len(self.drain()), 3)
+
+    def test_zero_window_disables_rate_limiting(self):
+        self.handler.window = 0
+        for _ in range(3):
+            self.handler.handle(make_record('boom'))
+        self.assertEqual(len(self.drain()), 3)
+        self.assertEqual(self.handler._windows, {})
+
+    def test_summary_on_duplicate_after_window(self):
+        for _ in range(4):
+            self.handler.handle(make_record('boom %s', 1))
+        self.monotonic.return_value = 110.0
+        self.handler.handle(make_record('boom %s', 1))
+        records = self.drain()
+        self.assertEqual([record.getMessage() for record in records], [
+            'boom 1',
+            'boom 1 [3 similar messages suppressed in the last 10s]',
+            'boom 1'
+        ])
+        self.assertEqual(records[1].levelname, 'ERROR')
+
+    def test_no_summary_without_suppressed_records(self):
+        self.handler.handle(make_record('boom'))
+        self.monotonic.return_value = 110.0
+        self.handler.flush_suppressed()
+        self.handler.handle(make_record('boom'))
+        self.assertEqual([record.getMessage() for record in self.drain()], ['boom', 'boom'])
+
+    def test_flush_suppressed_only_expired_windows(self):
+        self.handler.handle(make_record('old'))
+        self.handler.handle(make_record('old'))
+        self.monotonic.return_value = 105.0
+        self.handler.handle(make_record('new'))
+        self.handler.handle(make_record('new'))
+        self.drain()
+
+        self.monotonic.return_value = 110.0
+        self.handler.flush_suppressed()
+        self.assertEqual([record.getMessage() for record in self.drain()],
+                         ['old [1 similar messages suppressed in the last 10s]'])
+        self.assertEqual(len(self.handler._windows), 1)
+
+    def test_exception_messages_collapsed_by_value(self):
+        for _ in range(3):
+            self.handler.handle(make_record(ValueError('Expecting value')))
+        self.handler.handle(make_record(TypeError('Expecting value')))
+        self.assertEqual(len(self.drain()), 2)
+
+    def test_exception_not_retained(self):
+        try:
+            raise ValueError('Expecting value')
+        except ValueError as e:
+            record = make_record(e)
+            record.exc_info = (type(e), e, e.__traceback__)
+        self.handler.handle(record)
+        self.handler.handle(make_record(ValueError('Expecting value')))
+        (stored,) = self.handler._windows.values()
+        self.assertEqual(stored[2], ('tornado_skeleton', logging.ERROR, 'ValueError: Expecting value', ()))
+
+        self.monotonic.return_value = 110.0
+        self.handler.flush_suppressed()
+        summary = self.drain()[-1]
+        self.assertEqual(summary.getMessage(),
+                         'ValueError: Expecting value [1 similar messages suppressed in the last 10s]')
+        self.assertIsNone(summary.exc_info)
+
+    def test_unhashable_arguments_not_rate_limited(self):
+        for _ in range(2):
+            self.handler.handle(make_record('%s', ['unhashable']))
+        self.assertEqual(len(self.drain()), 2)
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((threading.current_thread(), record.getMessage()))
+
+
+class QueueLoggingTest(unittest.TestCase):
+    def setUp(self):
+        self.root = logging.getLogger()
+        self.root_level = self.root.level
+        self.addCleanup(self.root.setLevel, self.root_level)
+
+    def test_root_handlers_moved_behind_listener(self):
+        existing = RecordingHandler()
+        self.root.addHandler(existing)
+        self.addCleanup(self.root.removeHandler, existing)
+        root_handlers = list(self.root.handlers)
+
+        queue_logging = QueueLogging(level=logging.INFO, window=0)
+        queue_logging.start()
+        try:
+            self.assertEqual(self.root.handlers, [queue_logging.handler])
+            logging.getLogger('tornado_skeleton').info('hello %s', 'world')
+        finally:
+            queue_logging.stop()
+
+        self.assertEqual(self.root.handlers, root_handlers)
+        self.assertEqual(len(existing.records), 1)
+        thread, message = existing.records[0]
+        self.assertEqual(message, 'hello world')
+        self.assertIsNot(thread, threading.current_thread())
+
+    def test_default_stream_handler_without_root_handlers(self):
+        with mock.patch.object(self.root, 'handlers', []):
+            queue_logging = QueueLogging()
+            queue_logging.start()
+            try:
+                (handler,) = queue_logging.listener.handlers
+                self.assertIsInstance(handler, logging.StreamHandler)
+            finally:
+                queue_logging.stop()
+            self.assertEqual(self.root.handlers, [])
+
+    def test_given_handlers_added_to_root_handlers(self):
+        given = RecordingHandler()
+        with mock.patch.object(self.root, 'handlers', []):
+            queue_logging = QueueLogging(handlers=[given])
+            queue_logging.start()
+            try:
+                self.assertEqual(queue_logging.listener.handlers, (given,))
+            finally:
+                queue_logging.stop()
@@ -0,0 +1,76 @@
+# coding: utf-8
+
+import unittest
+
+from tornado_skeleton.api.serializers import JSON, Serializer, SerializerRegistry
+
+
+MSGPACK = Serializer('msgpack', 'application/msgpack', bytes, bytes)
+
+
+class SerializerRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = SerializerRegistry(JSON)
+        self.registry.register(MSGPACK, 'application/x-msgpack')
+
+    def assertNegotiated(self, accept, serializer):
+        self.assertIs(self.registry.negotiate(accept), serializer, accept)
+
+    def test_missing_accept_negotiates_default(self):
+        self.assertNegotiated(None, JSON)
+        self.assertNegotiated('', JSON)
+
+    def test_exact_media_types(self):
+        self.assertNegotiated('application/json', JSON)
+        self.assertNegotiated('application/msgpack', MSGPACK)
+        self.assertNegotiated('application/x-msgpack', MSGPACK)
+        self.assertNegotiated('Application/MsgPack', MSGPACK)
+
+    def test_unsupported_media_types_negotiate_default(self):
+        self.assertNegotiated('text/html', JSON)
+        self.assertNegotiated('text/html, image/*', JSON)
+
+    def test_quality_values(self):
+        self.assertNegotiated('application/json;q=0.5, application/msgpack', MSGPACK)
+        self.assertNegotiated('application/msgpack;q=0.4, application/json;q=0.5', JSON)
+        self.assertNegotiated('text/html, application/msgpack;q=0.1', MSGPACK)
+        self.assertNegotiated('application/msgpack ; q=0.9 , application/json ; q=0.8', MSGPACK)
+
+    def test_equal_quality_keeps_header_order(self):
+        self.assertNegotiated('application/msgpack, application/json', MSGPACK)
+        self.assertNegotiated('application/json, application/msgpack', JSON)
+
+    def test_zero_quality_excludes_media_type(self):
+        self.assertNegotiated('application/msgpack;q=0', JSON)
+        self.assertNegotiated('application/msgpack;q=0, */*', JSON)
+
+    def test_invalid_quality_excludes_media_type(self):
+        self.assertNegotiated('application/msgpack;q=high, application/json;q=0.1', JSON)
+
+    def test_wildcards(self):
+        self.assertNegotiated('*/*', JSON)
+        self.assertNegotiated('*', JSON)
+        self.assertNegotiated('application/*', JSON)
+        self.assertNegotiated('application/msgpack;q=0.5, */*;q=0.8', JSON)
+
+    def test_wildcard_subtype_without_default(self):
+        registry = SerializerRegistry(Serializer('text', 'text/plain', str, str))
+        registry.register(MSGPACK)
+        self.assertIs(registry.negotiate('application/*'), MSGPACK)
+
+    def test_negotiation_cached(self):
+        self.assertNegotiated('application/msgpack', MSGPACK)
+        self.assertIn('application/msgpack', self.registry._negotiated)
+        self.registry.register(Serializer('other', 'application/other', str, str))
+        self.assertEqual(self.registry._negotiated, {})
+
+    def test_for_content_type(self):
+        self.assertIs(self.registry.for_content_type('application/json; charset=UTF-8'), JSON)
+        self.assertIs(self.registry.for_content_type('application/x-msgpack'), MSGPACK)
+        self.assertIsNone(self.registry.for_content_type('text/plain'))
+        self.assertIsNone(self.registry.for_content_type(''))
+
+
+class JSONSerializerTest(unittest.TestCase):
+    def test_non_str_keys(self):
+        self.assertEqual(JSON.loads(JSON.dumps({1: 'a', 'b': [1, 2]})), {'1': 'a', 'b': [1, 2]})
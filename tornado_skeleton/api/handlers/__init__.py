@@ -1,2 +1,3 @@
+from .debug_handler import ProfileHandler, MemoryHandler, TasksHandler
 from .main_handler import MainHandler
 from .user_handler import UserHandler
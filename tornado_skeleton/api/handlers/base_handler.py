@@ -2,18 +2,15 @@
 
 import logging
 
-try:
-    import ujson as json
-except ImportError:
-    import json
 from tornado.web import RequestHandler
 from tradelab.collections.smart_dict import SmartDict
 
 from tornado_skeleton.helpers.error_code import ErrorCode
 from tornado_skeleton.api.response_errors import ResponseErrors
+from tornado_skeleton.api.serializers import registry
 
 
-CONTENT_TYPE = 'application/json'
+CONTENT_TYPE = registry.default.content_type
 
 ALLOWED_ORIGIN = '*'
 
@@ -64,6 +61,7 @@ class BaseHandler(RequestHandler):
         kwargs = SmartDict(**kwargs, raise_none=False)
         self.env = kwargs.get('env', '')
         self.version = kwargs.get('version', None)
+        self.error_code = None
 
         # Why don't we use the default parameter of kwargs.get(value, default) here?
         # Because if we do kwargs.get('logger', logging_context.get_logger(__name__)),
@@ -83,9 +81,21 @@ class BaseHandler(RequestHandler):
         self.allowed_headers = kwargs.get('access_control:allowed_headers', ALLOWED_HEADERS)
         self.allowed_methods = kwargs.get('access_control:allowed_methods', ALLOWED_METHODS)
 
+        self._serializer = None
+
         self.initialize(**kwargs.get())
         super().__init__(application, request, **kwargs.get())
 
+    @property
+    def serializer(self):
+        """
+        The serializer negotiated from the request Accept header,
+        used to encode the response.
+        """
+        if self._serializer is None:
+            self._serializer = registry.negotiate(self.request.headers.get('Accept'))
+        return self._serializer
+
     def initialize(self, **kwargs):
         """
         Empty method to override in inheriting classes.
@@ -99,6 +109,7 @@ class BaseHandler(RequestHandler):
         Override RequestHandler.set_default_headers().
         """
         self.set_header('Content-Type', CONTENT_TYPE)
+        self.set_header('Vary', 'Accept')
         self.set_header('Access-Control-Allow-Origin', self.allowed_origin)
         self.set_header('Access-Control-Allow-Headers', ','.join(self.allowed_headers))
         self.set_header('Access-Control-Allow-Methods', ','.join(self.allowed_methods))
@@ -168,6 +179,7 @@ class BaseHandler(RequestHandler):
     def send_response(self, data, status=200):
         """
         Send a response to the client with a RequestHandler.write operation.
+        The data is encoded with the serializer negotiated from the Accept header.
 
         :param data: The data to send as a response.
         :type data: bytes, unicode, dict
@@ -178,9 +190,11 @@ class BaseHandler(RequestHandler):
         self.set_status(status)
         if not data:
             return self.finish()
+        serializer = self.serializer
+        self.set_header('Content-Type', serializer.content_type)
         try:
-            self.write(json.dumps(data))
-        except (RuntimeError, TypeError) as e:
+            self.write(serializer.dumps(data))
+        except (RuntimeError, TypeError, ValueError, OverflowError) as e:
             self.logger.error(e)
             self.internal_server_error()
 
@@ -209,6 +223,7 @@ class BaseHandler(RequestHandler):
         from a gandalf.helpers.error_code.ErrorCode enum value.
         Use the overriden BaseHandler.send_error() method to
         create a response from the gandalf.api.response_errors.ResponseError.
+        The error is logged once, by BaseHandler.write_error().
 
         :param code: The ErrorCode used to produce a ResponseError and send a response.
         :type code: gandalf.helpers.error_code.ErrorCode
@@ -219,7 +234,7 @@ class BaseHandler(RequestHandler):
             self.internal_server_error()
             raise TypeError('Expected `code` to be of type gandalf.helpers.error_code.ErrorCode')
         error = ResponseErrors.response_for(code, **kwargs)
-        self.logger.error(error)
+        self.error_code = error['code']
         self.send_error(error['status'], data=error)
 
     def method_not_allowed_error(self, method):
@@ -240,18 +255,19 @@ class BaseHandler(RequestHandler):
 def require_body(method):
     """
     Prepare POST, PUT and PATCH requests by checking a few parameters.
-    Check the Content-Type header value which must be application/json*.
+    Check the Content-Type header value which must match a registered serializer, e.g. application/json*.
     Check that PUT and PATCH methods are not used on many-depth resource endpoints, see comment below.
     Check that the body exists.
-    Decode the body from a JSON string to a Python dictionary.
+    Decode the body to a Python dictionary with the serializer matching the Content-Type.
     """
     def decorator(self, *args, **kwargs):
         if self.request.method not in ('POST', 'PUT', 'PATCH'):
             return
 
-        content_type = self.request.headers.get('Content-Type', '')
-        if not content_type.startswith(CONTENT_TYPE):
-            return self.produce_error(ErrorCode.CONTENT_TYPE_HEADER_ERROR)
+        serializer = registry.for_content_type(self.request.headers.get('Content-Type', ''))
+        if serializer is None:
+            return self.produce_error(ErrorCode.CONTENT_TYPE_HEADER_ERROR,
+                                      content_types=', '.join(registry.content_types))
 
         # Check if a PUT or PATCH method is being applied to more than one-depth resources.
         # This is necessary since single-depth and many-depth resource endpoints share
@@ -272,10 +288,9 @@ def require_body(method):
             return self.produce_error(ErrorCode.MISSING_BODY)
 
         try:
-            self.request.body = json.decode(self.request.body)
-        except (TypeError, ValueError) as e:
-            self.logger.error(e)
-            self.internal_server_error()
+            self.request.body = serializer.loads(self.request.body)
+        except (TypeError, ValueError):
+            return self.produce_error(ErrorCode.MALFORMED_BODY, content_type=serializer.content_type)
 
         return method(self, *args, **kwargs)
     return decorator
@@ -0,0 +1,350 @@
+# coding: utf-8
+
+import asyncio
+import cProfile
+import hmac
+import io
+import math
+import os
+import pstats
+import time
+import tracemalloc
+
+from tornado.ioloop import IOLoop
+
+from tornado_skeleton.helpers.error_code import ErrorCode
+from tornado_skeleton.api.handlers.base_handler import BaseHandler
+
+
+DEBUG_TOKEN_HEADER = 'X-Debug-Token'
+
+DEFAULT_PROFILE_SECONDS = 10
+
+MAX_PROFILE_SECONDS = 300
+
+DEFAULT_STATS_LIMIT = 50
+
+MAX_TRACEMALLOC_FRAMES = 65535
+
+TRACEMALLOC_KEY_TYPES = ('lineno', 'filename', 'traceback')
+
+BOOLEAN_ARGUMENTS = {
+    'true': True, '1': True, 'yes': True,
+    'false': False, '0': False, 'no': False
+}
+
+# Profiling and memory tracing state is held per process,
+# hence per worker when the API runs in pre-fork mode.
+_profiling_session = None
+_tracemalloc_baseline = None
+
+
+class ProfilingSession(object):
+    """
+    Run cProfile on the IO loop for the next requests, or for a given duration,
+    whichever comes first.
+    Requests are counted by temporarily shadowing the application log_request()
+    method, so that nothing is left on the request path once the session is over.
+    Requests to the debug endpoints are not counted.
+    """
+
+    def __init__(self, application, requests=None, seconds=DEFAULT_PROFILE_SECONDS):
+        """
+        Initialize the ProfilingSession object.
+
+        :param application: The application serving the profiled requests.
+        :type application: tornado.web.Application
+        :param requests: The number of requests to profile, unbounded if None.
+        :type requests: int
+        :param seconds: The maximal duration of the session.
+        :type seconds: float
+        """
+        self.application = application
+        self.max_requests = requests
+        self.seconds = seconds
+        self.requests = 0
+        self.profiler = cProfile.Profile()
+        self.done = asyncio.Future()
+        self._started_at = None
+        self._duration = None
+        self._timeout = None
+
+    def start(self):
+        """Enable the profiler and start counting finished requests."""
+        self.profiler.enable()
+        self._started_at = time.monotonic()
+        self._log_request = self.application.log_request
+        self.application.log_request = self._count_request
+        self._timeout = IOLoop.current().call_later(self.seconds, self.stop)
+
+    def stop(self):
+        """Disable the profiler and restore the application log_request() method."""
+        if self.done.done():
+            return
+        self.profiler.disable()
+        self._duration = time.monotonic() - self._started_at
+        del self.application.log_request
+        IOLoop.current().remove_timeout(self._timeout)
+        self.done.set_result(None)
+
+    def stats(self, limit=DEFAULT_STATS_LIMIT):
+        """
+        Format the profiling statistics ranked by cumulative time.
+
+        :param limit: The number of functions to display.
+        :type limit: int
+        :return: The pstats report.
+        :rtype: str
+        """
+        stream = io.StringIO()
+        stream.write('Worker {}: profiled {} requests in {:.2f}s\n\n'.format(os.getpid(), self.requests, self._duration))
+        pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+
+    def _count_request(self, handler):
+        self._log_request(handler)
+        if isinstance(handler, DebugHandler):
+            return
+        self.requests += 1
+        if self.max_requests and self.requests >= self.max_requests:
+            self.stop()
+
+
+class InvalidArgument(Exception):
+    """
+    Raised when a query argument of a debug endpoint is invalid.
+    """
+
+    def __init__(self, parameter, expected_type):
+        super().__init__(parameter, expected_type)
+        self.parameter = parameter
+        self.expected_type = expected_type
+
+
+class DebugHandler(BaseHandler):
+    """
+    Base handler for the debug endpoints.
+    The requests must hold the configured token in the X-Debug-Token header.
+    """
+
+    def initialize(self, debug_token=None, **kwargs):
+        """
+        Retrieve the debug token from the initializers.
+
+        :param debug_token: The token expected in the X-Debug-Token header.
+        :type debug_token: str
+        """
+        self.debug_token = str(debug_token) if debug_token else None
+
+    def prepare(self):
+        """
+        Override RequestHandler.prepare() to reject requests without a valid debug token.
+        No token configured means every request is rejected.
+        """
+        token = self.request.headers.get(DEBUG_TOKEN_HEADER, '')
+        if not self.debug_token or not hmac.compare_digest(token.encode(), self.debug_token.encode()):
+            return self.produce_error(ErrorCode.FORBIDDEN, resource='the debug endpoints')
+
+    def get_number_argument(self, name, number_type, default=None, maximum=None):
+        """
+        Retrieve a finite positive number from the query arguments.
+
+        :param name: The name of the argument.
+        :type name: str
+        :param number_type: The expected type, int or float.
+        :type number_type: type
+        :param default: The value returned when the argument is missing.
+        :param maximum: The greatest accepted value, unbounded if None.
+        :return: The argument value.
+        :raise InvalidArgument: If the argument is not a finite positive number, or is above the maximum.
+        """
+        value = self.get_argument(name, None)
+        if value is None:
+            return default
+        try:
+            value = number_type(value)
+        except ValueError:
+            value = None
+        if maximum is not None and (value is None or not 0 < value <= maximum):
+            raise InvalidArgument(name, '{} between 1 and {}'.format(number_type.__name__, maximum))
+        if value is None or not math.isfinite(value) or value <= 0:
+            raise InvalidArgument(name, 'positive {}'.format(number_type.__name__))
+        return value
+
+    def get_boolean_argument(self, name, default=False):
+        """
+        Retrieve a boolean from the query arguments, e.g. true, false, 1 or 0.
+
+        :param name: The name of the argument.
+        :type name: str
+        :param default: The value returned when the argument is missing.
+        :type default: bool
+        :return: The argument value.
+        :raise InvalidArgument: If the argument is not a boolean.
+        """
+        value = self.get_argument(name, None)
+        if value is None:
+            return default
+        try:
+            return BOOLEAN_ARGUMENTS[value.strip().lower()]
+        except KeyError:
+            raise InvalidArgument(name, 'boolean')
+
+    def invalid_argument_error(self, error):
+        """
+        Encapsulation method.
+        Produce an error response when a query argument is invalid.
+        """
+        self.produce_error(ErrorCode.WRONG_PARAMETER_TYPE, parameter=error.parameter, type=error.expected_type)
+
+
+class ProfileHandler(DebugHandler):
+    session = None
+
+    async def get(self):
+        """
+        Profile the worker for the next `requests` requests or `seconds` seconds, whichever comes first.
+        The profiling lasts DEFAULT_PROFILE_SECONDS when no argument is given, and never
+        more than MAX_PROFILE_SECONDS.
+        Return status:
+            200 OK with the pstats report ranked by cumulative time, limited to `limit` functions
+            409 Conflict if a profiling session is already running on the worker
+        """
+        global _profiling_session
+
+        try:
+            requests = self.get_number_argument('requests', int)
+            seconds = self.get_number_argument('seconds', float,
+                                               MAX_PROFILE_SECONDS if requests else DEFAULT_PROFILE_SECONDS)
+            limit = self.get_number_argument('limit', int, DEFAULT_STATS_LIMIT)
+        except InvalidArgument as e:
+            return self.invalid_argument_error(e)
+        if _profiling_session is not None:
+            return self.produce_error(ErrorCode.PROFILER_ALREADY_RUNNING, pid=os.getpid())
+
+        session = ProfilingSession(self.application, requests, min(seconds, MAX_PROFILE_SECONDS))
+        try:
+            session.start()
+        except ValueError:
+            # Another profiler is already enabled on this thread
+            return self.produce_error(ErrorCode.PROFILER_ALREADY_RUNNING, pid=os.getpid())
+        _profiling_session = self.session = session
+        try:
+            await session.done
+        finally:
+            _profiling_session = None
+
+        self.set_header('Content-Type', 'text/plain; charset=UTF-8')
+        self.finish(session.stats(limit))
+
+    def on_connection_close(self):
+        """Stop the profiling session when the client goes away."""
+        if self.session is not None:
+            self.session.stop()
+
+
+class MemoryHandler(DebugHandler):
+    async def get(self):
+        """
+        Take a tracemalloc snapshot and compare it to the baseline snapshot.
+        The `key` argument groups allocations by 'lineno', 'filename' or 'traceback'.
+        The snapshot becomes the new baseline if the `reset` argument is true.
+        Return status:
+            200 OK with the top `limit` allocation sites ranked by size difference
+            409 Conflict if memory allocations are not traced
+        """
+        global _tracemalloc_baseline
+
+        try:
+            key_type = self.get_argument('key', 'lineno')
+            if key_type not in TRACEMALLOC_KEY_TYPES:
+                raise InvalidArgument('key', ' or '.join(TRACEMALLOC_KEY_TYPES))
+            limit = self.get_number_argument('limit', int, DEFAULT_STATS_LIMIT)
+            reset = self.get_boolean_argument('reset')
+        except InvalidArgument as e:
+            return self.invalid_argument_error(e)
+        if not tracemalloc.is_tracing() or _tracemalloc_baseline is None:
+            return self.produce_error(ErrorCode.TRACEMALLOC_NOT_STARTED, pid=os.getpid())
+
+        snapshot = _take_snapshot()
+        baseline = _tracemalloc_baseline
+        if reset:
+            _tracemalloc_baseline = snapshot
+        # Comparing snapshots is CPU-bound, keep it off the IO loop
+        statistics = await IOLoop.current().run_in_executor(None, snapshot.compare_to, baseline, key_type)
+
+        self.send_response({
+            'pid': os.getpid(),
+            'traced_memory': dict(zip(('current', 'peak'), tracemalloc.get_traced_memory())),
+            'statistics': [{
+                'traceback': statistic.traceback.format(),
+                'size': statistic.size,
+                'size_diff': statistic.size_diff,
+                'count': statistic.count,
+                'count_diff': statistic.count_diff
+            } for statistic in statistics[:limit]]
+        })
+
+    def post(self):
+        """
+        Start tracing memory allocations, storing `frames` frames per traceback, and take the baseline snapshot.
+        Restart the baseline if memory allocations are already traced.
+        Return status:
+            201 Created
+        """
+        global _tracemalloc_baseline
+
+        try:
+            frames = self.get_number_argument('frames', int, 1, maximum=MAX_TRACEMALLOC_FRAMES)
+        except InvalidArgument as e:
+            return self.invalid_argument_error(e)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _tracemalloc_baseline = _take_snapshot()
+        self.send_response({
+            'pid': os.getpid(),
+            'frames': tracemalloc.get_traceback_limit()
+        }, status=201)
+
+    def delete(self):
+        """
+        Stop tracing memory allocations and drop the baseline snapshot.
+        Return status:
+            204 No Content
+        """
+        global _tracemalloc_baseline
+
+        tracemalloc.stop()
+        _tracemalloc_baseline = None
+        self.send_response(None, status=204)
+
+
+class TasksHandler(DebugHandler):
+    def get(self):
+        """
+        Dump the stacks of the asyncio tasks alive on the worker IO loop.
+        Return status:
+            200 OK with the tasks and their stacks
+        """
+        tasks = []
+        for task in asyncio.all_tasks():
+            stream = io.StringIO()
+            task.print_stack(file=stream)
+            tasks.append({
+                'name': task.get_name(),
+                'coroutine': repr(task.get_coro()),
+                'done': task.done(),
+                'stack': stream.getvalue().splitlines()
+            })
+        self.send_response({
+            'pid': os.getpid(),
+            'tasks': tasks
+        })
+
+
+def _take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<unknown>')
+    ))
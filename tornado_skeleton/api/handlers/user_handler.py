@@ -2,8 +2,6 @@
 
 from datetime import datetime
 
-import ujson as json
-
 from tornado_skeleton.models.user import User
 from tornado_skeleton.helpers.error_code import ErrorCode
 from tornado_skeleton.api.handlers.base_handler import BaseHandler
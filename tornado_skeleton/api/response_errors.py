@@ -32,6 +32,13 @@ class ResponseErrors(object):
         'detail': 'The user {user} already exists, cannot create one.'
     }
 
+    MALFORMED_BODY = {
+        'status': 400,
+        'code': str(ErrorCode.MALFORMED_BODY),
+        'title': 'Malformed Body',
+        'detail': 'The body could not be decoded as {content_type}.'
+    }
+
     MISSING_BODY = {
         'status': 422,
         'code': str(ErrorCode.MISSING_BODY),
@@ -64,7 +71,28 @@ class ResponseErrors(object):
         'status': 400,
         'code': str(ErrorCode.CONTENT_TYPE_HEADER_ERROR),
         'title': 'Content-Type Header Error',
-        'detail': 'The Content-Type header is missing or invalid, with Gandalf only accepting \'Content-Type: application/json*\' headers.'
+        'detail': 'The Content-Type header is missing or invalid, with Gandalf only accepting \'Content-Type\' headers among: {content_types}.'
+    }
+
+    FORBIDDEN = {
+        'status': 403,
+        'code': str(ErrorCode.FORBIDDEN),
+        'title': 'Forbidden',
+        'detail': 'The request does not have the permission to access {resource}.'
+    }
+
+    PROFILER_ALREADY_RUNNING = {
+        'status': 409,
+        'code': str(ErrorCode.PROFILER_ALREADY_RUNNING),
+        'title': 'Profiler Already Running',
+        'detail': 'A profiling session is already running on worker {pid}.'
+    }
+
+    TRACEMALLOC_NOT_STARTED = {
+        'status': 409,
+        'code': str(ErrorCode.TRACEMALLOC_NOT_STARTED),
+        'title': 'Tracemalloc Not Started',
+        'detail': 'Memory allocations are not traced on worker {pid}, start tracing first.'
     }
 
     INTERNAL_SERVER_ERROR = {
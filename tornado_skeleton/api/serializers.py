@@ -0,0 +1,176 @@
+# coding: utf-8
+"""
+Serializers used to encode responses and decode request bodies.
+
+The JSON serializer relies on the fastest encoder available, picked once
+at import among orjson, ujson and the standard library json module.
+A MessagePack serializer is registered when the optional msgpack package
+is installed, providing a compact binary format for service-to-service calls.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_CONTENT_TYPE = 'application/json'
+
+MSGPACK_CONTENT_TYPE = 'application/msgpack'
+
+NEGOTIATION_CACHE_SIZE = 256
+
+
+class Serializer(object):
+    """
+    Pair of encoding and decoding functions bound to a media type.
+    """
+
+    def __init__(self, name, content_type, dumps, loads):
+        """
+        Initialize the Serializer object.
+
+        :param name: The name of the underlying library.
+        :type name: str
+        :param content_type: The media type of the encoded data, used as Content-Type header value.
+        :type content_type: str
+        :param dumps: The function encoding Python objects to str or bytes.
+        :type dumps: callable
+        :param loads: The function decoding str or bytes to Python objects.
+        :type loads: callable
+        """
+        self.name = name
+        self.content_type = content_type
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return '<Serializer {} ({})>'.format(self.content_type, self.name)
+
+
+class SerializerRegistry(object):
+    """
+    Registry of serializers per media type, providing content negotiation from Accept headers.
+    """
+
+    def __init__(self, default):
+        """
+        Initialize the SerializerRegistry object with a default serializer.
+
+        :param default: The serializer used when the client expresses no supported preference.
+        :type default: Serializer
+        """
+        self.default = default
+        self._serializers = {}
+        self._negotiated = {}
+        self.register(default)
+
+    def register(self, serializer, *aliases):
+        """
+        Register a serializer for its media type and the given aliases.
+
+        :param serializer: The serializer to register.
+        :type serializer: Serializer
+        :param aliases: Other media types handled by the serializer.
+        :type aliases: str
+        """
+        for content_type in (serializer.content_type,) + aliases:
+            self._serializers[content_type] = serializer
+        self._negotiated.clear()
+
+    @property
+    def content_types(self):
+        """List the registered media types."""
+        return list(self._serializers)
+
+    def for_content_type(self, content_type):
+        """
+        Retrieve the serializer for a Content-Type header value.
+
+        :param content_type: The Content-Type header value, parameters such as charset are ignored.
+        :type content_type: str
+        :return: The matching serializer, None if the media type is not supported.
+        :rtype: Serializer
+        """
+        return self._serializers.get(content_type.split(';', 1)[0].strip().lower())
+
+    def negotiate(self, accept):
+        """
+        Pick the serializer best matching an Accept header value.
+        Results are cached since clients keep sending the same Accept header.
+
+        :param accept: The Accept header value.
+        :type accept: str
+        :return: The preferred supported serializer, the default one if none is acceptable.
+        :rtype: Serializer
+        """
+        if not accept:
+            return self.default
+        serializer = self._negotiated.get(accept)
+        if serializer is None:
+            serializer = self._negotiate(accept)
+            if len(self._negotiated) >= NEGOTIATION_CACHE_SIZE:
+                self._negotiated.clear()
+            self._negotiated[accept] = serializer
+        return serializer
+
+    def _negotiate(self, accept):
+        media_ranges = []
+        for position, media_range in enumerate(accept.split(',')):
+            media_type, _, parameters = media_range.partition(';')
+            quality = 1.0
+            for parameter in parameters.split(';'):
+                key, _, value = parameter.partition('=')
+                if key.strip() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if quality > 0:
+                media_ranges.append((-quality, position, media_type.strip().lower()))
+
+        for _, _, media_type in sorted(media_ranges):
+            if media_type in ('*/*', '*'):
+                return self.default
+            if media_type.endswith('/*'):
+                if self.default.content_type.startswith(media_type[:-1]):
+                    return self.default
+                for content_type, serializer in self._serializers.items():
+                    if content_type.startswith(media_type[:-1]):
+                        return serializer
+            elif media_type in self._serializers:
+                return self._serializers[media_type]
+        return self.default
+
+
+def _json_serializer():
+    if orjson is not None:
+        # Non-str keys are rejected by default, unlike json and ujson
+        return Serializer('orjson', JSON_CONTENT_TYPE,
+                          lambda data: orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS),
+                          orjson.loads)
+    if ujson is not None:
+        return Serializer('ujson', JSON_CONTENT_TYPE, ujson.dumps, ujson.loads)
+    return Serializer('json', JSON_CONTENT_TYPE, json.dumps, json.loads)
+
+
+JSON = _json_serializer()
+
+registry = SerializerRegistry(JSON)
+
+if msgpack is not None:
+    MSGPACK = Serializer('msgpack', MSGPACK_CONTENT_TYPE,
+                         lambda data: msgpack.packb(data, use_bin_type=True),
+                         lambda data: msgpack.unpackb(data, raw=False))
+    registry.register(MSGPACK, 'application/x-msgpack')
+else:
+    MSGPACK = None
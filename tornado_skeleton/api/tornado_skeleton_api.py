@@ -1,13 +1,17 @@
 # coding: utf-8
 
+import logging
 import os
 
 import tornado.web
-from tornado import ioloop, log
+from tornado import ioloop
 from tradelab.config_object import ConfigObject
 from tradelab.utils.decorators import retry_address_in_use
 
 from tornado_skeleton.api.handlers import *
+from tornado_skeleton.helpers.queue_logging import QueueLogging, DEFAULT_RATE_LIMIT_WINDOW
+
+_access_logger = logging.getLogger('tornado.access')
 
 
 class URL(tuple):
@@ -42,7 +46,7 @@ class WebApplication(tornado.web.Application):
     Gandalf Application overriding tornado.web.Application with Gandalf-related logic around handlers and initializers.
     """
 
-    def __init__(self, initializers, session_factory, **kwargs):
+    def __init__(self, initializers, session_factory, debug_endpoints=None, **kwargs):
         """
         Initialize the WebApplication object with handlers.
         The given initializers are bound to each handler.
@@ -51,6 +55,10 @@ class WebApplication(tornado.web.Application):
                              at initialization to use across all the
                              handler's methods
         :type initializers: dict
+        :param debug_endpoints: The debug endpoints configuration, holding
+                                an `enabled` flag and the `token` to access them.
+                                The debug endpoints are not routed unless enabled.
+        :type debug_endpoints: dict
         """
         base_url = initializers.get('base_url')
 
@@ -59,8 +67,43 @@ class WebApplication(tornado.web.Application):
             URL(r'{base_url}/users/(?P<user_id>\d+)', UserHandler, initializers, base_url=base_url)
         ]
 
+        if debug_endpoints and debug_endpoints.get('enabled'):
+            debug_initializers = dict(initializers, debug_token=debug_endpoints.get('token'))
+            handlers += [
+                URL(r'{base_url}/_debug/profile', ProfileHandler, debug_initializers, base_url=base_url),
+                URL(r'{base_url}/_debug/memory', MemoryHandler, debug_initializers, base_url=base_url),
+                URL(r'{base_url}/_debug/tasks', TasksHandler, debug_initializers, base_url=base_url)
+            ]
+
         super().__init__(handlers, session_factory=session_factory, **kwargs)
 
+    def log_request(self, handler):
+        """
+        Override tornado.web.Application.log_request() to write a single structured access-log line per request.
+        The message is only formatted by the logging listener thread.
+        The `log_function` application setting takes precedence, as in Tornado.
+        The URI comes from the client, it is quoted and escaped to keep the line parseable.
+
+        :param handler: The handler which processed the request.
+        :type handler: tornado.web.RequestHandler
+        """
+        if 'log_function' in self.settings:
+            self.settings['log_function'](handler)
+            return
+        status = handler.get_status()
+        if status < 400:
+            level = logging.INFO
+        elif status < 500:
+            level = logging.WARNING
+        else:
+            level = logging.ERROR
+        if not _access_logger.isEnabledFor(level):
+            return
+        request = handler.request
+        _access_logger.log(level, 'status=%d method=%s uri=%r remote_ip=%s duration_ms=%.2f error_code=%s',
+                           status, request.method, request.uri, request.remote_ip,
+                           1000.0 * request.request_time(), getattr(handler, 'error_code', None) or '-')
+
 
 class TornadoSkeletonAPI(ConfigObject):
     """
@@ -88,6 +131,10 @@ class TornadoSkeletonAPI(ConfigObject):
 
         self.base_url = self.get('api:base_url')
         self.port = self.get('api:port')
+        self.log_level = self.get('logging:level') or 'INFO'
+        self.log_rate_limit_window = self.get('logging:rate_limit_window')
+        if self.log_rate_limit_window is None:
+            self.log_rate_limit_window = DEFAULT_RATE_LIMIT_WINDOW
         self.handlers_initializer = {
             'env': self.env,
             'contact': self.get('contact'),
@@ -97,9 +144,19 @@ class TornadoSkeletonAPI(ConfigObject):
 
     @retry_address_in_use(exception=OSError, count=10, delay=1, verbose=True)
     def start(self):
-        """Start the API by loading the WebApplication object and creating an IO loop."""
-        log.enable_pretty_logging()
-        application = WebApplication(self.handlers_initializer, None, debug=self.get('debug'))
-        application.listen(self.port)
-        # _logger.info('Gandalf %sAPI running on port %s', self.env + ' ' if self.env else '', self.port)
-        ioloop.IOLoop.current().start()
+        """
+        Start the API by loading the WebApplication object and creating an IO loop.
+        Logging goes through a queue written by a background thread for the lifetime of the IO loop.
+        """
+        queue_logging = QueueLogging(level=self.log_level, window=self.log_rate_limit_window)
+        queue_logging.start()
+        try:
+            application = WebApplication(self.handlers_initializer, None,
+                                         debug_endpoints=self.get('debug_endpoints'), debug=self.get('debug'))
+            application.listen(self.port)
+            # _logger.info('Gandalf %sAPI running on port %s', self.env + ' ' if self.env else '', self.port)
+            if self.log_rate_limit_window:
+                ioloop.PeriodicCallback(queue_logging.flush_suppressed, self.log_rate_limit_window * 1000).start()
+            ioloop.IOLoop.current().start()
+        finally:
+            queue_logging.stop()
@@ -12,12 +12,17 @@ class ErrorCode(Enum):
     USER_NOT_FOUND = 1200  # Kasserine, TN
     USER_ALREADY_EXISTS = 1300
 
+    MALFORMED_BODY = 75016  # Paris 16th, FR
     MISSING_BODY = 75017  # Paris 17th, FR
     MISSING_PARAMETER = 75018  # Paris 18th, FR
     WRONG_PARAMETER_TYPE = 75019  # Paris 19th, FR
     METHOD_NOT_ALLOWED = 75020  # Paris 20th, FR
     CONTENT_TYPE_HEADER_ERROR = 76000  # Rouen, FR
 
+    FORBIDDEN = 69001  # Lyon 1st, FR
+    PROFILER_ALREADY_RUNNING = 69002  # Lyon 2nd, FR
+    TRACEMALLOC_NOT_STARTED = 69003  # Lyon 3rd, FR
+
     INTERNAL_SERVER_ERROR = 92260  # Fontenay-aux-Roses, FR
 
     def __str__(self):
@@ -0,0 +1,191 @@
+# coding: utf-8
+"""
+Non-blocking logging for the API.
+
+Records emitted on the IOLoop are pushed to an in-memory queue and
+formatted and written by a background thread, so that slow stdout or
+disk I/O never stalls request handling.
+"""
+
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from tornado.log import LogFormatter
+
+
+DEFAULT_RATE_LIMIT_WINDOW = 10.0
+
+SUPPRESSED_MESSAGE = '%s [%d similar messages suppressed in the last %.0fs]'
+
+
+class RateLimitedQueueHandler(QueueHandler):
+    """
+    QueueHandler collapsing duplicate records within a time window.
+
+    The first record of a kind is enqueued, identical records logged during
+    the following `window` seconds are only counted; a summary holding the
+    number of suppressed records is enqueued once the window is over.
+    Records below `level` are never rate limited, and a `window` of 0 disables rate limiting.
+    """
+
+    def __init__(self, log_queue, window=DEFAULT_RATE_LIMIT_WINDOW, level=logging.ERROR):
+        """
+        Initialize the RateLimitedQueueHandler object.
+
+        :param log_queue: The queue shared with the QueueListener.
+        :type log_queue: queue.Queue
+        :param window: The duration in seconds during which duplicates are suppressed.
+        :type window: float
+        :param level: The minimal level of rate limited records.
+        :type level: int
+        """
+        super().__init__(log_queue)
+        self.window = window
+        self.rate_limit_level = level
+        self._windows = {}
+        self._windows_lock = threading.Lock()
+
+    def prepare(self, record):
+        """
+        Override QueueHandler.prepare() to enqueue the record untouched.
+        The default implementation formats the record on the calling thread,
+        which is precisely the work we want to move off the IOLoop.
+        The queue is in-process, so the record does not need to be pickled.
+        """
+        return record
+
+    def handle(self, record):
+        """
+        Override logging.Handler.handle() to drop duplicate records.
+
+        :param record: The record to enqueue.
+        :type record: logging.LogRecord
+        :return: Whether the record was enqueued.
+        :rtype: bool
+        """
+        if self.window and record.levelno >= self.rate_limit_level and not self._admit(record):
+            return False
+        return super().handle(record)
+
+    def flush_suppressed(self):
+        """
+        Enqueue a summary for every elapsed window holding suppressed records.
+        Meant to be called periodically, otherwise summaries are only
+        produced when a duplicate shows up after its window is over.
+        """
+        now = time.monotonic()
+        with self._windows_lock:
+            expired = [(key, entry) for key, entry in self._windows.items() if now - entry[0] >= self.window]
+            for key, _ in expired:
+                del self._windows[key]
+        for _, (_, suppressed, key) in expired:
+            self._summarize(key, suppressed)
+
+    def _admit(self, record):
+        # Non-str messages, e.g. exceptions, hash by identity and hold
+        # their traceback: key and store them by their string value instead
+        msg = record.msg if isinstance(record.msg, str) else '{}: {}'.format(type(record.msg).__name__, record.msg)
+        try:
+            key = (record.name, record.levelno, msg, record.args)
+            hash(key)
+        except TypeError:
+            return True
+
+        now = time.monotonic()
+        with self._windows_lock:
+            entry = self._windows.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                return False
+            self._windows[key] = [now, 0, key]
+
+        if entry is not None:
+            self._summarize(entry[2], entry[1])
+        return True
+
+    def _summarize(self, key, suppressed):
+        if not suppressed:
+            return
+        name, levelno, msg, args = key
+        summary = logging.makeLogRecord({
+            'name': name,
+            'levelno': levelno,
+            'levelname': logging.getLevelName(levelno),
+            'msg': SUPPRESSED_MESSAGE,
+            'args': (msg % args if args else msg, suppressed, self.window)
+        })
+        super().handle(summary)
+
+
+class QueueLogging(object):
+    """
+    Route every record of the root logger through a RateLimitedQueueHandler
+    to a QueueListener writing to the actual handlers on a background thread.
+
+    The handlers already installed on the root logger, e.g. by tornado options
+    or a host process, are moved behind the listener while logging is started,
+    so that no record is ever written on the calling thread. As with
+    tornado.log.enable_pretty_logging(), a stream handler using Tornado's
+    pretty formatter is only added when there is no other handler.
+    """
+
+    def __init__(self, level=logging.INFO, window=DEFAULT_RATE_LIMIT_WINDOW, handlers=None):
+        """
+        Initialize the QueueLogging object.
+
+        :param level: The level of the root logger.
+        :type level: int, str
+        :param window: The duration in seconds during which duplicate errors are suppressed.
+        :type window: float
+        :param handlers: The handlers actually writing the records,
+                         in addition to the ones already installed on the root logger.
+        :type handlers: list
+        """
+        self.level = level
+        self.handlers = list(handlers or [])
+        self.queue = queue.Queue(-1)
+        self.handler = RateLimitedQueueHandler(self.queue, window=window)
+        self.listener = None
+        self._root_handlers = []
+
+    def start(self):
+        """
+        Move the root logger handlers behind the listener, install the queue handler
+        on the root logger and start the listener thread.
+        """
+        root = logging.getLogger()
+        self._root_handlers = list(root.handlers)
+        for handler in self._root_handlers:
+            root.removeHandler(handler)
+
+        handlers = self._root_handlers + self.handlers
+        if not handlers:
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(LogFormatter())
+            handlers = [stream_handler]
+
+        self.listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+        root.setLevel(self.level)
+        root.addHandler(self.handler)
+        self.listener.start()
+
+    def stop(self):
+        """
+        Flush pending summaries, uninstall the queue handler, wait for the listener
+        to drain the queue and give the root logger its handlers back.
+        """
+        self.handler.flush_suppressed()
+        root = logging.getLogger()
+        root.removeHandler(self.handler)
+        self.listener.stop()
+        self.listener = None
+        for handler in self._root_handlers:
+            root.addHandler(handler)
+        self._root_handlers = []
+
+    def flush_suppressed(self):
+        """Enqueue the summaries of the elapsed rate limiting windows."""
+        self.handler.flush_suppressed()